@@ -6,6 +6,7 @@ load_dotenv()
 # Discord
 DISCORD_BOT_TOKEN = os.getenv("DISCORD_BOT_TOKEN")
 FASTAPI_URL = "http://localhost:8000/query"
+FASTAPI_TIMEOUT = 60
 
 # API Keys
 TOGETHER_API_KEY = os.getenv("TOGETHER_API_KEY")
@@ -14,11 +15,11 @@ COINBASE_API_SECRET = os.getenv("COINBASE_API_SECRET")
 
 # API URLs
 COINBASE_API_BASE_URL = "https://api.coinbase.com"
-COINBASE_API_V2_URL = f"{COINBASE_API_BASE_URL}/v2"
-COINBASE_API_V3_URL = f"{COINBASE_API_BASE_URL}/api/v3"
 
 # LLM Settings
 LLM_MODEL = "meta-llama/Llama-3.3-70B-Instruct-Turbo-Free"
 LLM_MAX_TOKENS = 200
 LLM_TEMPERATURE = 0.7
-LLM_TOP_P = 0.9 
\ No newline at end of file
+LLM_TOP_P = 0.9
+LLM_TIMEOUT = 10
+LLM_MAX_RETRIES = 2 
\ No newline at end of file
@@ -1,9 +1,12 @@
 # frank_bot.py
+import asyncio
+import aiohttp
 import discord
-import requests
 import logging
+import orjson
+from typing import Dict
 from discord.ext import commands
-from bot.config.settings import DISCORD_BOT_TOKEN, FASTAPI_URL
+from bot.config.settings import DISCORD_BOT_TOKEN, FASTAPI_URL, FASTAPI_TIMEOUT
 
 # Set up logging
 logging.basicConfig(level=logging.INFO)
@@ -12,7 +15,26 @@ logger = logging.getLogger(__name__)
 intents = discord.Intents.default()
 intents.message_content = True
 
-bot = commands.Bot(command_prefix="!", intents=intents)
+class Frank(commands.Bot):
+    """Discord bot holding a pooled session to the FastAPI backend"""
+
+    async def setup_hook(self):
+        self.session = aiohttp.ClientSession(
+            timeout=aiohttp.ClientTimeout(total=FASTAPI_TIMEOUT),
+            json_serialize=lambda obj: orjson.dumps(obj).decode()
+        )
+
+    async def close(self):
+        if hasattr(self, "session"):
+            await self.session.close()
+        await super().close()
+
+bot = Frank(command_prefix="!", intents=intents)
+
+async def ask_backend(prompt: str) -> Dict:
+    """Send a prompt to the FastAPI backend without blocking the event loop"""
+    async with bot.session.post(FASTAPI_URL, json={"prompt": prompt}) as response:
+        return await response.json(loads=orjson.loads)
 
 @bot.event
 async def on_ready():
@@ -65,13 +87,15 @@ async def on_message(message):
         await message.channel.send("Thinking...")
 
         try:
-            response = requests.post(FASTAPI_URL, json={"prompt": message.content})
-            data = response.json()
+            data = await ask_backend(message.content)
             
             if "error" in data:
                 await message.channel.send(f"❌ Error: {data['error']}")
             else:
                 await message.channel.send(data["response"][:2000])
+        except asyncio.TimeoutError:
+            logger.error("Timed out waiting for the backend")
+            await message.channel.send("Sorry, that took too long. Please try again. ⌛")
         except Exception as e:
             logger.error(f"Error processing message: {e}")
             await message.channel.send("Something went wrong. 😞")
@@ -80,9 +104,10 @@ async def on_message(message):
 async def price(ctx, symbol: str):
     """Get current price of a cryptocurrency"""
     try:
-        response = requests.post(FASTAPI_URL, json={"prompt": f"what is the price of {symbol}"})
-        data = response.json()
+        data = await ask_backend(f"what is the price of {symbol}")
         await ctx.send(data["response"])
+    except asyncio.TimeoutError:
+        await ctx.send("❌ Error: Request timed out")
     except Exception as e:
         logger.error(f"Error in price command: {e}")
         await ctx.send(f"❌ Error: {str(e)}")
@@ -91,9 +116,10 @@ async def price(ctx, symbol: str):
 async def portfolio(ctx):
     """View your portfolio balance"""
     try:
-        response = requests.post(FASTAPI_URL, json={"prompt": "show my portfolio"})
-        data = response.json()
+        data = await ask_backend("show my portfolio")
         await ctx.send(data["response"])
+    except asyncio.TimeoutError:
+        await ctx.send("❌ Error: Request timed out")
     except Exception as e:
         logger.error(f"Error in portfolio command: {e}")
         await ctx.send(f"❌ Error: {str(e)}")
@@ -102,9 +128,10 @@ async def portfolio(ctx):
 async def market(ctx):
     """Check current market status"""
     try:
-        response = requests.post(FASTAPI_URL, json={"prompt": "what's the market status"})
-        data = response.json()
+        data = await ask_backend("what's the market status")
         await ctx.send(data["response"])
+    except asyncio.TimeoutError:
+        await ctx.send("❌ Error: Request timed out")
     except Exception as e:
         logger.error(f"Error in market command: {e}")
         await ctx.send(f"❌ Error: {str(e)}")
@@ -113,9 +140,10 @@ async def market(ctx):
 async def trade(ctx, amount: float, symbol: str):
     """Execute a trade"""
     try:
-        response = requests.post(FASTAPI_URL, json={"prompt": f"buy {amount} {symbol}"})
-        data = response.json()
+        data = await ask_backend(f"buy {amount} {symbol}")
         await ctx.send(data["response"])
+    except asyncio.TimeoutError:
+        await ctx.send("❌ Error: Request timed out")
     except Exception as e:
         logger.error(f"Error in trade command: {e}")
         await ctx.send(f"❌ Error: {str(e)}")
@@ -1,7 +1,7 @@
 from typing import Dict, Optional
 from dataclasses import dataclass
 
-@dataclass
+@dataclass(slots=True)
 class TradeIntent:
     intent: str  # "trade|price|portfolio|market|chat"
     symbol: Optional[str]  # "BTC|ETH|etc"
@@ -9,13 +9,13 @@ class TradeIntent:
     side: Optional[str]  # "buy|sell"
     response: Optional[str] = None  # chat
 
-@dataclass
+@dataclass(slots=True)
 class TradeResponse:
     success: bool
     message: str
     data: Optional[Dict] = None
 
-@dataclass
+@dataclass(slots=True)
 class MarketStatus:
     btc: Dict[str, Optional[float]]
     eth: Dict[str, Optional[float]] 
\ No newline at end of file
@@ -1,59 +1,217 @@
-import requests
+import asyncio
+import httpx
 import logging
-import json
+import orjson
+import time
 import uuid
-from typing import Dict, Optional
+from collections import OrderedDict
+from functools import lru_cache
+from typing import Dict, List, Optional, Tuple
 from coinbase import jwt_generator
 from bot.config.settings import (
     COINBASE_API_KEY,
     COINBASE_API_SECRET,
-    COINBASE_API_V2_URL,
-    COINBASE_API_V3_URL
+    COINBASE_API_BASE_URL
 )
 
 logger = logging.getLogger(__name__)
 
+# Shared client so Coinbase calls reuse pooled keep-alive connections
+_client: Optional[httpx.AsyncClient] = None
+
+# Cap concurrent spot price requests to stay clear of Coinbase rate limits
+PRICE_REQUEST_CONCURRENCY = 10
+_price_slots: Optional[asyncio.Semaphore] = None
+
+# Coinbase JWTs are valid for 120s; reuse each one for most of that window
+JWT_TTL = 110
+JWT_REFRESH_MARGIN = 5
+_jwt_cache: Dict[Tuple[str, str], Tuple[str, float]] = {}
+_jwt_requests: Dict[Tuple[str, str], "asyncio.Future[str]"] = {}
+
+# Spot prices are stable over a few seconds; keep a small bounded cache
+PRICE_CACHE_TTL = 5
+PRICE_CACHE_SIZE = 128
+_price_cache: "OrderedDict[str, Tuple[float, float]]" = OrderedDict()
+_price_requests: Dict[str, "asyncio.Future[Optional[float]]"] = {}
+
+# Absorb repeated portfolio requests; cleared whenever a trade goes through
+PORTFOLIO_CACHE_TTL = 10
+_portfolio_cache: Optional[Tuple[List[Tuple[str, float]], float]] = None
+# Bumped by each trade so a fetch that overlaps one can't store stale holdings
+_portfolio_generation = 0
+
+async def _log_response(response: httpx.Response) -> None:
+    """Log the outcome of every Coinbase request"""
+    logger.debug("%s %s -> %s, headers: %s", response.request.method,
+                 response.request.url.path, response.status_code, response.headers)
+
+@lru_cache(maxsize=64)
+def _jwt_uri(method: str, path: str) -> str:
+    """Format the JWT URI claim for a request"""
+    return jwt_generator.format_jwt_uri(method, path)
+
+def _parse_day_change(response) -> Optional[float]:
+    """Parse a historic price response into a 24h percentage change"""
+    if response.status_code != 200:
+        return None
+    # Prices are returned newest first; only the endpoints are needed
+    prices = orjson.loads(response.content)["data"]["prices"]
+    first = float(prices[-1]["price"])
+    last = float(prices[0]["price"])
+    return (last - first) / first * 100.0
+
 class CoinbaseService:
     @staticmethod
-    def get_jwt(method: str, path: str) -> str:
-        """Generate JWT for Coinbase API"""
-        jwt_uri = jwt_generator.format_jwt_uri(method, path)
-        return jwt_generator.build_rest_jwt(jwt_uri, COINBASE_API_KEY, COINBASE_API_SECRET)
+    async def startup() -> None:
+        """Open the shared HTTP client for Coinbase API calls"""
+        global _client, _price_slots
+        _price_slots = asyncio.Semaphore(PRICE_REQUEST_CONCURRENCY)
+        _client = httpx.AsyncClient(
+            base_url=COINBASE_API_BASE_URL,
+            timeout=10.0,
+            limits=httpx.Limits(max_keepalive_connections=20, max_connections=100),
+            headers={"Accept-Encoding": "gzip, br"},
+            event_hooks={"response": [_log_response]},
+            http2=True
+        )
+
+    @staticmethod
+    async def shutdown() -> None:
+        """Close the shared HTTP client"""
+        global _client
+        if _client is not None:
+            await _client.aclose()
+            _client = None
+
+    @staticmethod
+    async def get_jwt(method: str, path: str) -> str:
+        """Generate JWT for Coinbase API, reusing a cached token until it nears expiry"""
+        key = (method, path)
+        cached = _jwt_cache.get(key)
+        if cached and cached[1] - time.monotonic() > JWT_REFRESH_MARGIN:
+            return cached[0]
+
+        # Coalesce concurrent misses for the same key into one signing
+        request = _jwt_requests.get(key)
+        if request is None:
+            request = asyncio.ensure_future(CoinbaseService._sign_jwt(method, path))
+            _jwt_requests[key] = request
+            request.add_done_callback(lambda _: _jwt_requests.pop(key, None))
+        return await asyncio.shield(request)
 
     @staticmethod
-    def get_crypto_price(symbol: str) -> Optional[float]:
-        """Get current price of a cryptocurrency"""
+    async def _sign_jwt(method: str, path: str) -> str:
+        """Sign a fresh JWT for a request and cache it"""
+        # Signing is CPU-bound; keep it off the event loop
+        jwt_uri = _jwt_uri(method, path)
+        token = await asyncio.to_thread(
+            jwt_generator.build_rest_jwt, jwt_uri, COINBASE_API_KEY, COINBASE_API_SECRET
+        )
+        _jwt_cache[(method, path)] = (token, time.monotonic() + JWT_TTL)
+        return token
+
+    @staticmethod
+    async def get_crypto_price(symbol: str) -> Optional[float]:
+        """Get current price of a cryptocurrency, served from cache while fresh"""
+        cached = _price_cache.get(symbol)
+        if cached and cached[1] > time.monotonic():
+            _price_cache.move_to_end(symbol)
+            return cached[0]
+
+        # Coalesce concurrent misses for the same symbol into one request
+        request = _price_requests.get(symbol)
+        if request is None:
+            request = asyncio.ensure_future(CoinbaseService._fetch_crypto_price(symbol))
+            _price_requests[symbol] = request
+            request.add_done_callback(lambda _: _price_requests.pop(symbol, None))
+        return await asyncio.shield(request)
+
+    @staticmethod
+    async def get_spot_prices(symbols: List[str]) -> Dict[str, Optional[float]]:
+        """Get current prices for several cryptocurrencies concurrently"""
+        prices = await asyncio.gather(*(CoinbaseService.get_crypto_price(symbol) for symbol in symbols))
+        return dict(zip(symbols, prices))
+
+    @staticmethod
+    async def _fetch_crypto_price(symbol: str) -> Optional[float]:
+        """Fetch a spot price from Coinbase and cache it"""
         try:
-            response = requests.get(f"{COINBASE_API_V2_URL}/prices/{symbol}-USD/spot")
+            async with _price_slots:
+                response = await _client.get(f"/v2/prices/{symbol}-USD/spot")
             if response.status_code == 200:
-                return float(response.json()["data"]["amount"])
+                price = float(orjson.loads(response.content)["data"]["amount"])
+                _price_cache[symbol] = (price, time.monotonic() + PRICE_CACHE_TTL)
+                _price_cache.move_to_end(symbol)
+                if len(_price_cache) > PRICE_CACHE_SIZE:
+                    _price_cache.popitem(last=False)
+                return price
             return None
-        except Exception as e:
-            logger.error(f"Error getting price: {e}")
+        except (httpx.HTTPError, KeyError, ValueError) as e:
+            logger.error("Error getting price: %s", e)
             return None
 
     @staticmethod
-    def get_portfolio_balance() -> Optional[Dict]:
-        """Get user's portfolio balance"""
+    async def get_market_status() -> Dict:
+        """Get current market status for major cryptocurrencies"""
+        try:
+            prices, btc_historic, eth_historic = await asyncio.gather(
+                CoinbaseService.get_spot_prices(["BTC", "ETH"]),
+                _client.get("/v2/prices/BTC-USD/historic", params={"period": "day"}),
+                _client.get("/v2/prices/ETH-USD/historic", params={"period": "day"})
+            )
+
+            btc_price = prices["BTC"]
+            eth_price = prices["ETH"]
+
+            # Get 24h price changes
+            btc_change = _parse_day_change(btc_historic) if btc_price else None
+            eth_change = _parse_day_change(eth_historic) if eth_price else None
+
+            return {
+                "btc": {"price": btc_price, "change_24h": btc_change},
+                "eth": {"price": eth_price, "change_24h": eth_change}
+            }
+        except (httpx.HTTPError, KeyError, ValueError) as e:
+            logger.error("Error getting market status: %s", e)
+            return {}
+
+    @staticmethod
+    async def get_portfolio_balance() -> Optional[List[Tuple[str, float]]]:
+        """Get user's non-zero balances as (currency, amount) pairs"""
+        global _portfolio_cache
+        if _portfolio_cache and _portfolio_cache[1] > time.monotonic():
+            return _portfolio_cache[0]
+
+        generation = _portfolio_generation
         try:
-            jwt_token = CoinbaseService.get_jwt("GET", "/v2/accounts")
+            jwt_token = await CoinbaseService.get_jwt("GET", "/v2/accounts")
             headers = {"Authorization": f"Bearer {jwt_token}"}
-            response = requests.get(f"{COINBASE_API_V2_URL}/accounts", headers=headers)
+            response = await _client.get("/v2/accounts", headers=headers)
             if response.status_code == 200:
-                return response.json()
+                # Keep only the two fields we use so the full payload can be freed
+                holdings = []
+                for account in orjson.loads(response.content).get("data", []):
+                    balance = float(account.get("balance", {}).get("amount", 0))
+                    if balance > 0:
+                        holdings.append((account.get("currency"), balance))
+                if generation == _portfolio_generation:
+                    _portfolio_cache = (holdings, time.monotonic() + PORTFOLIO_CACHE_TTL)
+                return holdings
             return None
-        except Exception as e:
-            logger.error(f"Error getting portfolio: {e}")
+        except (httpx.HTTPError, KeyError, ValueError) as e:
+            logger.error("Error getting portfolio: %s", e)
             return None
 
     @staticmethod
-    def execute_trade(symbol: str, side: str, amount: float) -> Dict:
+    async def execute_trade(symbol: str, side: str, amount: float) -> Dict:
         """Execute a trade on Coinbase"""
+        global _portfolio_cache, _portfolio_generation
         try:
             product_id = f"{symbol.upper()}-USD"
             request_method = "POST"
             request_path = "/api/v3/brokerage/orders"
-            jwt_token = CoinbaseService.get_jwt(request_method, request_path)
+            jwt_token = await CoinbaseService.get_jwt(request_method, request_path)
             
             headers = {
                 "Authorization": f"Bearer {jwt_token}",
@@ -61,7 +219,7 @@ class CoinbaseService:
             }
 
             # Get current price to calculate USD amount
-            current_price = CoinbaseService.get_crypto_price(symbol)
+            current_price = await CoinbaseService.get_crypto_price(symbol)
             if not current_price:
                 return {
                     "success": False,
@@ -72,7 +230,7 @@ class CoinbaseService:
             usd_amount = amount * current_price
             formatted_usd_amount = f"{usd_amount:.2f}"
             
-            logger.info(f"Current price: ${current_price}, USD amount: ${formatted_usd_amount}")
+            logger.info("Current price: $%s, USD amount: $%s", current_price, formatted_usd_amount)
             
             # Configure order based on side
             if side.upper() == "BUY":
@@ -82,62 +240,72 @@ class CoinbaseService:
                 order_config = {"market_market_ioc": {"base_size": formatted_crypto_amount}}
 
             body = {
-                "client_order_id": str(uuid.uuid4()),
+                "client_order_id": uuid.uuid4().hex,
                 "product_id": product_id,
                 "side": side.upper(),
                 "order_configuration": order_config
             }
 
-            logger.info(f"Executing trade with body: {json.dumps(body, indent=2)}")
-            response = requests.post(
-                f"{COINBASE_API_V3_URL}/brokerage/orders",
+            if logger.isEnabledFor(logging.INFO):
+                logger.info("Executing trade with body: %s", orjson.dumps(body, option=orjson.OPT_INDENT_2).decode())
+            response = await _client.post(
+                request_path,
                 headers=headers,
                 json=body
             )
-            
-            logger.info(f"Response status: {response.status_code}")
-            logger.info(f"Response headers: {dict(response.headers)}")
-            
-            try:
-                response_data = response.json()
-                logger.info(f"Response data: {json.dumps(response_data, indent=2)}")
-            except json.JSONDecodeError:
-                logger.error(f"Failed to parse response as JSON: {response.text}")
-                response_data = {}
-            
-            if response.status_code == 200:
-                if response_data.get("success"):
-                    order = response_data.get("order", {})
-                    success_response = order.get("success_response", {})
-                    order_config = order.get("order_configuration", {})
-                    market_ioc = order_config.get("market_market_ioc", {})
-                    
-                    return {
-                        "success": True,
-                        "message": f"✅ Trade executed successfully!\n"
-                                  f"Side: {success_response.get('side')}\n"
-                                  f"Product: {success_response.get('product_id')}\n"
-                                  f"Amount: {market_ioc.get('base_size') or market_ioc.get('quote_size')}\n"
-                                  f"Order ID: {success_response.get('order_id')}"
-                    }
-                else:
-                    error_msg = response_data.get('error', 'Unknown error')
-                    error_details = response_data.get('error_details', '')
-                    message = response_data.get('message', '')
-                    preview_failure = response_data.get('preview_failure_reason', '')
-                    return {
-                        "success": False,
-                        "message": f"❌ Trade failed: {error_msg}\nDetails: {error_details}\nMessage: {message}\nPreview: {preview_failure}"
-                    }
-            else:
-                error_msg = response_data.get('message', response.text)
-                error_details = response_data.get('error_details', '')
+            response.raise_for_status()
+
+            response_data = orjson.loads(response.content)
+            if logger.isEnabledFor(logging.INFO):
+                logger.info("Response data: %s", orjson.dumps(response_data, option=orjson.OPT_INDENT_2).decode())
+
+            if response_data.get("success"):
+                # Read each field on its own so one missing key doesn't blank the rest
+                success_response = response_data.get("success_response", {})
+                market_ioc = response_data.get("order_configuration", {}).get("market_market_ioc", {})
+                order_side = success_response.get("side")
+                order_product = success_response.get("product_id")
+                order_id = success_response.get("order_id")
+                order_amount = market_ioc.get("base_size") or market_ioc.get("quote_size")
+
+                # Balances have changed
+                _portfolio_cache = None
+                _portfolio_generation += 1
+
                 return {
-                    "success": False,
-                    "message": f"❌ API Error ({response.status_code}):\nError: {error_msg}\nDetails: {error_details}"
+                    "success": True,
+                    "message": f"✅ Trade executed successfully!\n"
+                              f"Side: {order_side}\n"
+                              f"Product: {order_product}\n"
+                              f"Amount: {order_amount}\n"
+                              f"Order ID: {order_id}"
                 }
-        except Exception as e:
-            logger.error(f"Error executing trade: {str(e)}", exc_info=True)
+
+            # Rejected orders carry their reasons under error_response
+            error_response = response_data.get("error_response", {})
+            error_msg = error_response.get('error', 'Unknown error')
+            error_details = error_response.get('error_details', '')
+            message = error_response.get('message', '')
+            preview_failure = error_response.get('preview_failure_reason', '')
+            return {
+                "success": False,
+                "message": f"❌ Trade failed: {error_msg}\nDetails: {error_details}\nMessage: {message}\nPreview: {preview_failure}"
+            }
+        except httpx.HTTPStatusError as e:
+            response = e.response
+            logger.error("Trade rejected with status %s", response.status_code)
+            try:
+                response_data = orjson.loads(response.content)
+            except orjson.JSONDecodeError:
+                response_data = {}
+            error_msg = response_data.get('message', response.text)
+            error_details = response_data.get('error_details', '')
+            return {
+                "success": False,
+                "message": f"❌ API Error ({response.status_code}):\nError: {error_msg}\nDetails: {error_details}"
+            }
+        except (httpx.HTTPError, KeyError, ValueError) as e:
+            logger.error("Error executing trade: %s", e, exc_info=True)
             return {
                 "success": False,
                 "message": f"❌ Error: {str(e)}"
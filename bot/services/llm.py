@@ -1,92 +1,219 @@
+import asyncio
 import logging
-import json
+import orjson
 import re
-from together import Together
+import time
+from collections import OrderedDict
+from typing import Dict, Optional, Tuple
+from together import AsyncTogether
 from bot.config.settings import (
     TOGETHER_API_KEY,
     LLM_MODEL,
     LLM_MAX_TOKENS,
     LLM_TEMPERATURE,
-    LLM_TOP_P
+    LLM_TOP_P,
+    LLM_TIMEOUT,
+    LLM_MAX_RETRIES
 )
 from bot.models.trade import TradeIntent
 
 logger = logging.getLogger(__name__)
 
+# Identical prompts classify the same way; skip the LLM for repeats.
+# Trades are commands with side effects, so only informational intents are cached.
+INTENT_CACHE_TTL = 300
+INTENT_CACHE_SIZE = 1024
+CACHEABLE_INTENTS = frozenset({"price", "portfolio", "market", "chat"})
+
+# Shared Together client, created on first use
+_client: Optional[AsyncTogether] = None
+
+# Punctuation, except signs and decimal points that can be part of amounts
+_PUNCTUATION_RE = re.compile(r"[^\w\s.+-]|\.(?!\d)")
+
+def find_json_object(text: str) -> Optional[str]:
+    """Find the first balanced {...} object in text with a single linear scan"""
+    depth = 0
+    start = -1
+    in_string = False
+    escaped = False
+    for i, char in enumerate(text):
+        if in_string:
+            if escaped:
+                escaped = False
+            elif char == "\\":
+                escaped = True
+            elif char == '"':
+                in_string = False
+        elif char == '"':
+            if depth:
+                in_string = True
+        elif char == "{":
+            if depth == 0:
+                start = i
+            depth += 1
+        elif char == "}" and depth:
+            depth -= 1
+            if depth == 0:
+                return text[start:i + 1]
+    return None
+
+# Keyword rules for short, explicit prompts that don't need the LLM, matched
+# against the whole normalized text. Coin names and anything conversational
+# ("should I buy...", "don't sell...") are left to the LLM.
+_RULE_SYMBOLS = frozenset({
+    "btc", "eth", "sol", "xrp", "ada", "doge", "dot", "ltc", "bch", "link",
+    "avax", "matic", "uni", "atom", "xlm", "shib", "usdc", "usdt"
+})
+_TRADE_RULE_RE = re.compile(r"(buy|sell) (\d*\.?\d+(?:e[-+]?\d+)?) ([a-z0-9]{2,10})")
+_PRICE_RULE_RE = re.compile(r"(?:(?:what is|what s|whats) )?(?:the )?(?:current )?price of ([a-z0-9]{2,10})|([a-z0-9]{2,10}) price")
+_MARKET_RULE_RE = re.compile(r"(?:(?:what is|what s|whats|show|show me) )?(?:the )?market (?:status|overview|update)")
+_PORTFOLIO_RULE_RE = re.compile(r"(?:(?:show|show me|check|view|what is|what s|whats) )?(?:(?:in )?my )?(?:portfolio|holdings|balances?)")
+
+def normalize_prompt(user_prompt: str) -> str:
+    """Normalize a prompt for cache lookups"""
+    return " ".join(_PUNCTUATION_RE.sub(" ", user_prompt.lower()).split())
+
+# Static system prompt; kept byte-identical across calls so the provider can reuse its prefix cache
+_SYSTEM_PROMPT = """You are a crypto trading assistant named Frank. Analyze each request and respond with a JSON object.
+The JSON must have these exact fields:
+{
+    "intent": "trade|price|portfolio|market|chat",
+    "symbol": "BTC|ETH|etc" or null,
+    "amount": number or null,
+    "side": "buy|sell" or null,
+    "response": "your response to the user" or null
+}
+
+Examples:
+- "what's the price of BTC?" -> {"intent": "price", "symbol": "BTC", "amount": null, "side": null, "response": null}
+- "show my portfolio" -> {"intent": "portfolio", "symbol": null, "amount": null, "side": null, "response": null}
+- "buy 0.1 BTC" -> {"intent": "trade", "symbol": "BTC", "amount": 0.1, "side": "buy", "response": null}
+- "hi" -> {"intent": "chat", "symbol": null, "amount": null, "side": null, "response": "Hello! I'm Frank, your crypto trading assistant. How can I help you today?"}
+- "how are you?" -> {"intent": "chat", "symbol": null, "amount": null, "side": null, "response": "I'm doing great! Ready to help you with any crypto trading questions or tasks."}
+
+For general chat, use the "chat" intent and provide a friendly, helpful response in the "response" field.
+For trading-related queries, use the appropriate intent and leave "response" as null."""
+
+def get_client() -> AsyncTogether:
+    """Get the shared Together client, creating it on first use"""
+    global _client
+    if _client is None:
+        _client = AsyncTogether(
+            api_key=TOGETHER_API_KEY,
+            timeout=LLM_TIMEOUT,
+            max_retries=LLM_MAX_RETRIES
+        )
+    return _client
+
+async def stream_intent_json(user_prompt: str) -> str:
+    """Stream the intent completion, stopping as soon as the JSON object closes"""
+    stream = await get_client().chat.completions.create(
+        model=LLM_MODEL,
+        messages=[
+            {"role": "system", "content": _SYSTEM_PROMPT},
+            {"role": "user", "content": user_prompt}
+        ],
+        max_tokens=LLM_MAX_TOKENS,
+        temperature=LLM_TEMPERATURE,
+        top_p=LLM_TOP_P,
+        response_format={"type": "json_object"},
+        stream=True
+    )
+
+    # Close the stream on early return or cancellation so the connection is
+    # released and the provider stops generating
+    response_text = ""
+    try:
+        async for chunk in stream:
+            delta = chunk.choices[0].delta.content if chunk.choices else None
+            if not delta:
+                continue
+            response_text += delta
+            if "}" in delta:
+                candidate = find_json_object(response_text)
+                if candidate:
+                    return candidate
+    finally:
+        await stream.close()
+    return response_text
+
+def match_rule_intent(prompt: str) -> Optional[TradeIntent]:
+    """Classify an obvious normalized prompt without calling the LLM"""
+    match = _TRADE_RULE_RE.fullmatch(prompt)
+    if match:
+        if match.group(3) not in _RULE_SYMBOLS:
+            return None
+        return TradeIntent(
+            intent="trade",
+            symbol=match.group(3).upper(),
+            amount=float(match.group(2)),
+            side=match.group(1)
+        )
+    match = _PRICE_RULE_RE.fullmatch(prompt)
+    if match:
+        symbol = match.group(1) or match.group(2)
+        if symbol not in _RULE_SYMBOLS:
+            return None
+        return TradeIntent(intent="price", symbol=symbol.upper(), amount=None, side=None)
+    if _MARKET_RULE_RE.fullmatch(prompt):
+        return TradeIntent(intent="market", symbol=None, amount=None, side=None)
+    if _PORTFOLIO_RULE_RE.fullmatch(prompt):
+        return TradeIntent(intent="portfolio", symbol=None, amount=None, side=None)
+    return None
+
 class LLMService:
     def __init__(self):
-        self.client = Together(api_key=TOGETHER_API_KEY)
+        self._intent_cache: "OrderedDict[str, Tuple[TradeIntent, float]]" = OrderedDict()
+        self._intent_requests: Dict[str, asyncio.Future] = {}
 
-    def get_trade_intent(self, user_prompt: str) -> TradeIntent:
+    async def get_trade_intent(self, user_prompt: str) -> TradeIntent:
         """Get trading intent from user prompt using LLM"""
+        key = normalize_prompt(user_prompt)
+        rule_intent = match_rule_intent(key)
+        if rule_intent:
+            return rule_intent
+
+        cached = self._intent_cache.get(key)
+        if cached and cached[1] > time.monotonic():
+            self._intent_cache.move_to_end(key)
+            return cached[0]
+
+        # Coalesce concurrent misses for the same prompt into one completion
+        request = self._intent_requests.get(key)
+        if request is None:
+            request = asyncio.ensure_future(self._fetch_trade_intent(key, user_prompt))
+            self._intent_requests[key] = request
+            request.add_done_callback(lambda _: self._intent_requests.pop(key, None))
+        return await asyncio.shield(request)
+
+    async def _fetch_trade_intent(self, key: str, user_prompt: str) -> TradeIntent:
+        """Classify a prompt with the LLM and cache informational intents"""
         try:
-            response = self.client.chat.completions.create(
-                model=LLM_MODEL,
-                messages=[{
-                    "role": "user", 
-                    "content": f"""You are a crypto trading assistant named Frank. Analyze this request and respond with a JSON object.
-                    The JSON must have these exact fields:
-                    {{
-                        "intent": "trade|price|portfolio|market|chat",
-                        "symbol": "BTC|ETH|etc" or null,
-                        "amount": number or null,
-                        "side": "buy|sell" or null,
-                        "response": "your response to the user" or null
-                    }}
-
-                    Examples:
-                    - "what's the price of BTC?" -> {{"intent": "price", "symbol": "BTC", "amount": null, "side": null, "response": null}}
-                    - "show my portfolio" -> {{"intent": "portfolio", "symbol": null, "amount": null, "side": null, "response": null}}
-                    - "buy 0.1 BTC" -> {{"intent": "trade", "symbol": "BTC", "amount": 0.1, "side": "buy", "response": null}}
-                    - "hi" -> {{"intent": "chat", "symbol": null, "amount": null, "side": null, "response": "Hello! I'm Frank, your crypto trading assistant. How can I help you today?"}}
-                    - "how are you?" -> {{"intent": "chat", "symbol": null, "amount": null, "side": null, "response": "I'm doing great! Ready to help you with any crypto trading questions or tasks."}}
-
-                    For general chat, use the "chat" intent and provide a friendly, helpful response in the "response" field.
-                    For trading-related queries, use the appropriate intent and leave "response" as null.
-
-                    Request: {user_prompt}"""
-                }],
-                max_tokens=LLM_MAX_TOKENS,
-                temperature=LLM_TEMPERATURE,
-                top_p=LLM_TOP_P
+            # The client retries failed requests; this bounds a stalled stream
+            response_text = await asyncio.wait_for(
+                stream_intent_json(user_prompt),
+                LLM_TIMEOUT * (LLM_MAX_RETRIES + 1)
             )
+            logger.info("LLM Response: %.512s", response_text)
             
-            response_text = response.choices[0].message.content
-            logger.info(f"LLM Response: {response_text}")
+            data = orjson.loads(response_text)
             
-            try:
-                # First try direct JSON parsing
-                data = json.loads(response_text)
-            except json.JSONDecodeError:
-                try:
-                    # Try to find JSON-like structure in the text
-                    json_match = re.search(r'\{.*\}', response_text, re.DOTALL)
-                    if json_match:
-                        data = json.loads(json_match.group())
-                except:
-                    # If that fails, try to extract key information using regex
-                    intent_match = re.search(r'"intent"\s*:\s*"([^"]+)"', response_text)
-                    symbol_match = re.search(r'"symbol"\s*:\s*"([^"]+)"', response_text)
-                    amount_match = re.search(r'"amount"\s*:\s*(\d+\.?\d*)', response_text)
-                    side_match = re.search(r'"side"\s*:\s*"([^"]+)"', response_text)
-                    response_match = re.search(r'"response"\s*:\s*"([^"]+)"', response_text)
-                    
-                    data = {
-                        "intent": intent_match.group(1) if intent_match else None,
-                        "symbol": symbol_match.group(1) if symbol_match else None,
-                        "amount": float(amount_match.group(1)) if amount_match else None,
-                        "side": side_match.group(1) if side_match else None,
-                        "response": response_match.group(1) if response_match else None
-                    }
-            
-            return TradeIntent(
+            trade_intent = TradeIntent(
                 intent=data.get("intent"),
                 symbol=data.get("symbol"),
                 amount=data.get("amount"),
                 side=data.get("side"),
                 response=data.get("response")
             )
+
+            if trade_intent.intent in CACHEABLE_INTENTS:
+                self._intent_cache[key] = (trade_intent, time.monotonic() + INTENT_CACHE_TTL)
+                self._intent_cache.move_to_end(key)
+                if len(self._intent_cache) > INTENT_CACHE_SIZE:
+                    self._intent_cache.popitem(last=False)
+            return trade_intent
             
         except Exception as e:
-            logger.error(f"Error getting trade intent: {e}")
+            logger.error("Error getting trade intent: %s", e)
             return TradeIntent(intent=None, symbol=None, amount=None, side=None, response=None) 
\ No newline at end of file
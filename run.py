@@ -1,11 +1,11 @@
-import subprocess
-import sys
-import os
-import time
-from threading import Thread
-import signal
-import psutil
+import asyncio
 import logging
+import sys
+import uvicorn
+try:
+    import uvloop
+except ImportError:  # uvloop isn't available on Windows
+    uvloop = None
 from bot.frank import bot
 from bot.config.settings import DISCORD_BOT_TOKEN
 
@@ -13,56 +13,52 @@ from bot.config.settings import DISCORD_BOT_TOKEN
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-def run_fastapi():
-    """Run the FastAPI server"""
-    try:
-        logger.info("Starting FastAPI server...")
-        subprocess.run([sys.executable, "-m", "uvicorn", "bot.backend:app", "--reload"], check=True)
-    except subprocess.CalledProcessError as e:
-        logger.error(f"FastAPI server error: {e}")
-    except Exception as e:
-        logger.error(f"Error running FastAPI server: {e}")
+async def run_fastapi(server: uvicorn.Server):
+    """Run the FastAPI server on the current event loop"""
+    logger.info("Starting FastAPI server...")
+    await server.serve()
 
-def run_discord_bot():
-    """Run the Discord bot"""
-    try:
-        logger.info("Starting Discord bot...")
-        bot.run(DISCORD_BOT_TOKEN)
-    except Exception as e:
-        logger.error(f"Error running Discord bot: {e}")
+async def run_discord_bot():
+    """Run the Discord bot on the current event loop"""
+    logger.info("Starting Discord bot...")
+    async with bot:
+        await bot.start(DISCORD_BOT_TOKEN)
 
-def cleanup():
-    """Clean up processes on exit"""
-    logger.info("Cleaning up processes...")
-    current_process = psutil.Process()
-    children = current_process.children(recursive=True)
-    for child in children:
-        try:
-            child.terminate()
-        except psutil.NoSuchProcess:
-            pass
+async def main():
+    """Serve the backend and the Discord bot from one process and event loop"""
+    config = uvicorn.Config("bot.backend:app", host="127.0.0.1", port=8000, http="httptools")
+    server = uvicorn.Server(config)
+    server_task = asyncio.create_task(run_fastapi(server))
 
-if __name__ == "__main__":
-    # Register cleanup handler
-    signal.signal(signal.SIGINT, lambda s, f: cleanup())
-    signal.signal(signal.SIGTERM, lambda s, f: cleanup())
-    
-    try:
-        # Start FastAPI server in a separate thread
-        fastapi_thread = Thread(target=run_fastapi)
-        fastapi_thread.daemon = True  # Thread will exit when main program exits
-        fastapi_thread.start()
+    # Hold the bot back until the backend is accepting connections
+    logger.info("Waiting for FastAPI server to start...")
+    delay = 0.05
+    while not server.started and not server_task.done():
+        await asyncio.sleep(delay)
+        delay = min(delay * 2, 1.0)
+    if server_task.done():
+        server_task.result()
+        raise RuntimeError("FastAPI server exited before it started")
 
-        # Give FastAPI server time to start
-        logger.info("Waiting for FastAPI server to start...")
-        time.sleep(5)
+    # Either side stopping takes the other down with it
+    bot_task = asyncio.create_task(run_discord_bot())
+    done, _ = await asyncio.wait({server_task, bot_task}, return_when=asyncio.FIRST_COMPLETED)
+    if bot_task in done:
+        server.should_exit = True
+    else:
+        bot_task.cancel()
+    await asyncio.gather(server_task, bot_task, return_exceptions=True)
+    for task in done:
+        task.result()
 
-        # Run Discord bot in main thread
-        run_discord_bot()
+if __name__ == "__main__":
+    # Serve the backend and the bot on libuv when it's installed
+    if uvloop is not None:
+        asyncio.set_event_loop_policy(uvloop.EventLoopPolicy())
+    try:
+        asyncio.run(main())
     except KeyboardInterrupt:
-        logger.info("\nShutting down...")
-        cleanup()
+        logger.info("Shutting down...")
     except Exception as e:
         logger.error(f"Error: {e}")
-        cleanup()
-        sys.exit(1) 
\ No newline at end of file
+        sys.exit(1)
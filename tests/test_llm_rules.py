@@ -0,0 +1,53 @@
+import pytest
+from bot.services.llm import match_rule_intent, normalize_prompt
+
+def classify(prompt):
+    return match_rule_intent(normalize_prompt(prompt))
+
+@pytest.mark.parametrize("prompt", [
+    "Don't sell 1 BTC!",
+    "I would never sell 100 btc",
+    "should I buy 5 eth",
+    "what if i buy 2 sol",
+    "sell -1 btc",
+    "buy 10 usd",
+    "buy 1 bitcoin",
+])
+def test_conversational_or_unknown_trades_go_to_llm(prompt):
+    assert classify(prompt) is None
+
+@pytest.mark.parametrize("prompt, side, amount, symbol", [
+    ("buy 0.1 BTC", "buy", 0.1, "BTC"),
+    ("Sell .5 eth!", "sell", 0.5, "ETH"),
+    ("buy 1e-05 btc", "buy", 0.00001, "BTC"),
+])
+def test_explicit_trade_commands(prompt, side, amount, symbol):
+    intent = classify(prompt)
+    assert (intent.intent, intent.side, intent.amount, intent.symbol) == ("trade", side, amount, symbol)
+
+@pytest.mark.parametrize("prompt", [
+    "What's the price of Bitcoin?",
+    "what is the price of ethereum",
+])
+def test_coin_names_go_to_llm(prompt):
+    assert classify(prompt) is None
+
+@pytest.mark.parametrize("prompt, symbol", [
+    ("what is the price of BTC", "BTC"),
+    ("ETH price?", "ETH"),
+])
+def test_price_of_known_ticker(prompt, symbol):
+    intent = classify(prompt)
+    assert (intent.intent, intent.symbol) == ("price", symbol)
+
+@pytest.mark.parametrize("prompt, expected", [
+    ("show my portfolio", "portfolio"),
+    ("What's my balance?", "portfolio"),
+    ("what's the market status", "market"),
+    ("how do I rebalance my portfolio", None),
+    ("sell my portfolio", None),
+    ("is the market status bad for me", None),
+])
+def test_portfolio_and_market_rules(prompt, expected):
+    intent = classify(prompt)
+    assert (intent.intent if intent else None) == expected